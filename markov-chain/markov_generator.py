@@ -1,8 +1,52 @@
 import re
+import sys
 from collections import defaultdict, Counter
+from functools import partial
+from multiprocessing import Pool
 import random
 import json
 
+import numpy as np
+
+try:
+    import orjson
+except ImportError:  # optional; stdlib json works, just slower
+    orjson = None
+
+# Matches words and sentence endings, compiled once at import. The \b
+# anchors matter: they reject letter runs glued to digits or underscores
+# ("2nd", "abc123") instead of extracting fragments from them.
+_TOKEN_RE = re.compile(r'\b[a-zA-Z]+\b|[.!?]')
+
+def _tokenize(text):
+    """Lowercase and split one text into words and sentence endings.
+
+    Interning the tokens makes repeated words share one string object, so
+    the Counter lookups during training hit CPython's pointer-compare fast
+    path instead of rehashing equal strings.
+    """
+    return [sys.intern(word) for word in _TOKEN_RE.findall(text.lower())]
+
+def _count_text(text, order):
+    """Tokenize one text and count its (state, next_word) transitions.
+
+    Module-level so it can run in a multiprocessing worker; per-text counts
+    merge associatively, which is what makes training parallelizable.
+    """
+    words = _tokenize(text)
+    pair_counts = Counter()
+
+    for i in range(len(words) - order):
+        # Current state (1 or more words)
+        if order == 1:
+            current_state = words[i]
+        else:
+            current_state = tuple(words[i:i+order])
+
+        pair_counts[(current_state, words[i + order])] += 1
+
+    return pair_counts
+
 class MarkovTransitionGenerator:
     def __init__(self, order=1):
         """
@@ -12,42 +56,41 @@ class MarkovTransitionGenerator:
             order (int): Order of the Markov chain (1 = current word, 2 = current 2 words, etc.)
         """
         self.order = order
-        self.transitions = defaultdict(Counter)
-        self.word_counts = Counter()
+        # One flat Counter keyed on (state, next_word) pairs; per-state
+        # grouping is derived on demand in generate_dice_mapping
+        self.pair_counts = Counter()
+        self._roll_table_cache = None
+        self._starters_cache = None
+        self._rng = np.random.default_rng()
+        self._roll_buffer = ()
+        self._roll_index = 0
     
+    # Below this many texts, spinning up worker processes costs more than
+    # the parallel counting saves
+    PARALLEL_THRESHOLD = 50
+
     def clean_text(self, text):
         """Clean and tokenize text into words, preserving sentence endings."""
-        # Convert to lowercase and split into words, keeping sentence endings
-        words = re.findall(r'\b[a-zA-Z]+\b|[.!?]', text.lower())
-        return words
-    
+        return _tokenize(text)
+
     def train(self, texts):
         """
         Train the Markov chain on input texts.
-        
+
         Args:
             texts (list): List of text strings to analyze
         """
-        all_words = []
-        
-        # Process each text
-        for text in texts:
-            words = self.clean_text(text)
-            all_words.extend(words)
-            
-            # Build transitions based on order
-            for i in range(len(words) - self.order):
-                # Current state (1 or more words)
-                if self.order == 1:
-                    current_state = words[i]
-                else:
-                    current_state = tuple(words[i:i+self.order])
-                
-                next_word = words[i + self.order]
-                
-                # Record transition
-                self.transitions[current_state][next_word] += 1
-                self.word_counts[current_state] += 1
+        # Each text produces an independent Counter of transitions, so big
+        # corpora can be counted across worker processes and merged here;
+        # small ones stay serial to avoid the pool spin-up cost
+        if len(texts) >= self.PARALLEL_THRESHOLD:
+            with Pool() as pool:
+                parts = pool.map(partial(_count_text, order=self.order), texts)
+        else:
+            parts = (_count_text(text, self.order) for text in texts)
+
+        for part in parts:
+            self.pair_counts.update(part)
     
     def generate_dice_mapping(self, max_dice_sides=6):
         """
@@ -59,12 +102,18 @@ class MarkovTransitionGenerator:
         Returns:
             dict: Mapping of states to dice roll outcomes
         """
+        # Group pair counts by state in a single pass; list order follows
+        # first-occurrence order, same as the per-state Counters used to
+        by_state = defaultdict(list)
+        for (state, next_word), count in self.pair_counts.items():
+            by_state[state].append((next_word, count))
+
         dice_mappings = {}
-        
-        for state, next_words in self.transitions.items():
+
+        for state, next_words in by_state.items():
             # Get most common next words
-            common_words = next_words.most_common()
-            
+            common_words = sorted(next_words, key=lambda wc: wc[1], reverse=True)
+
             # Determine how many dice sides we need
             num_outcomes = len(common_words)
             
@@ -84,28 +133,26 @@ class MarkovTransitionGenerator:
     
     def _create_single_die_mapping(self, word_counts, die_sides):
         """Create a mapping of die rolls to words based on frequency."""
-        total_count = sum(count for word, count in word_counts)
-        
-        # Calculate proportional dice assignments
+        # Calculate proportional dice assignments in one vectorized pass:
+        # every word gets at least one side, rounded from its share of the
+        # total count (np.rint rounds half-to-even, matching round()).
+        counts = np.array([count for word, count in word_counts], dtype=np.int64)
+        sides = np.maximum(1, np.rint(counts * die_sides / counts.sum())).astype(np.int64)
+
+        # Derive each word's roll range from the running total, capped at
+        # the number of sides on the die
+        ends = np.minimum(np.cumsum(sides), die_sides)
+        starts = np.empty_like(ends)
+        starts[0] = 1
+        starts[1:] = ends[:-1] + 1
+
         dice_mapping = {}
-        current_roll = 1
-        
-        for word, count in word_counts:
-            # Calculate how many sides this word should get
-            proportion = count / total_count
-            sides_for_word = max(1, round(proportion * die_sides))
-            
-            # Assign dice rolls to this word
-            roll_range = []
-            for _ in range(sides_for_word):
-                if current_roll <= die_sides:
-                    roll_range.append(current_roll)
-                    current_roll += 1
-            
-            if roll_range:
-                dice_mapping[word] = roll_range
-        
+        for (word, count), start, end in zip(word_counts, starts, ends):
+            if start <= end:
+                dice_mapping[word] = list(range(int(start), int(end) + 1))
+
         # Fill remaining sides with most common word if needed
+        current_roll = int(ends[-1]) + 1
         if current_roll <= die_sides:
             most_common_word = word_counts[0][0]
             remaining_sides = list(range(current_roll, die_sides + 1))
@@ -113,9 +160,30 @@ class MarkovTransitionGenerator:
                 dice_mapping[most_common_word].extend(remaining_sides)
             else:
                 dice_mapping[most_common_word] = remaining_sides
-        
+
         return dice_mapping
     
+    def _build_roll_table(self, dice_mappings):
+        """Build a direct roll -> word lookup list for each state.
+
+        Cached per dice_mappings object so repeated story generation pays
+        the construction cost once.
+        """
+        if self._roll_table_cache and self._roll_table_cache[0] is dice_mappings:
+            return self._roll_table_cache[1]
+
+        roll_table = {}
+        for state, word_mappings in dice_mappings.items():
+            max_roll = max(rolls[-1] for rolls in word_mappings.values())
+            lookup = [None] * (max_roll + 1)
+            for word, rolls in word_mappings.items():
+                for roll in rolls:
+                    lookup[roll] = word
+            roll_table[state] = lookup
+
+        self._roll_table_cache = (dice_mappings, roll_table)
+        return roll_table
+
     def save_to_json(self, dice_mappings, filename="markov_transitions.json"):
         """Save dice mappings to JSON file."""
         # Convert tuples to strings for JSON serialization
@@ -127,9 +195,13 @@ class MarkovTransitionGenerator:
                 state_key = state
             json_data[state_key] = mappings
         
-        with open(filename, 'w') as f:
-            json.dump(json_data, f, indent=2)
-        
+        if orjson is not None:
+            with open(filename, 'wb') as f:
+                f.write(orjson.dumps(json_data, option=orjson.OPT_INDENT_2))
+        else:
+            with open(filename, 'w') as f:
+                json.dump(json_data, f, indent=2)
+
         print(f"Transition table saved to {filename}")
         return filename
     def print_transition_table(self, dice_mappings):
@@ -147,11 +219,12 @@ class MarkovTransitionGenerator:
             
             print("  Roll 1 die:")
             
-            # Sort by dice values for cleaner presentation
+            # Sort by dice values for cleaner presentation. Roll lists are
+            # built in ascending order, so no scan is needed for the bounds.
             sorted_mappings = []
             for word, rolls in word_mappings.items():
-                min_roll = min(rolls)
-                max_roll = max(rolls)
+                min_roll = rolls[0]
+                max_roll = rolls[-1]
                 if min_roll == max_roll:
                     range_str = str(min_roll)
                 else:
@@ -168,6 +241,20 @@ class MarkovTransitionGenerator:
             
             print()
     
+    # How many die rolls to draw from numpy at a time; one vectorized call
+    # amortizes the per-roll Python overhead across many generated words
+    ROLL_BATCH_SIZE = 256
+
+    def _next_roll(self):
+        """Return the next simulated die roll, drawn in batches."""
+        if self._roll_index >= len(self._roll_buffer):
+            self._roll_buffer = self._rng.integers(1, 7, size=self.ROLL_BATCH_SIZE)
+            self._roll_index = 0
+
+        roll = self._roll_buffer[self._roll_index]
+        self._roll_index += 1
+        return int(roll)
+
     def generate_sample_story(self, dice_mappings, start_word=None, num_sentences=2):
         """Generate a sample story with complete sentences."""
         if not start_word:
@@ -175,7 +262,8 @@ class MarkovTransitionGenerator:
         
         story_sentences = []
         current_state = start_word
-        
+        roll_table = self._build_roll_table(dice_mappings)
+
         for sentence_num in range(num_sentences):
             sentence = []
             
@@ -195,17 +283,11 @@ class MarkovTransitionGenerator:
                     sentence.append('.')
                     break
                 
-                # Simulate dice roll
-                word_mappings = dice_mappings[current_state]
-                roll = random.randint(1, 6)
-                
-                # Find which word this roll corresponds to
-                next_word = None
-                for word, rolls in word_mappings.items():
-                    if roll in rolls:
-                        next_word = word
-                        break
-                
+                # Simulate dice roll and look the word up directly
+                lookup = roll_table[current_state]
+                roll = self._next_roll()
+                next_word = lookup[roll] if roll < len(lookup) else None
+
                 if not next_word:
                     sentence.append('.')
                     break
@@ -234,18 +316,21 @@ class MarkovTransitionGenerator:
         
         return ' '.join(story_sentences)
     
+    # Common sentence starters, tried in preference to arbitrary words
+    STARTER_WORDS = ('the', 'a', 'an', 'i', 'you', 'he', 'she', 'it', 'they', 'we')
+
     def _get_sentence_starter(self, dice_mappings):
         """Get a good word to start a new sentence."""
-        # Look for common sentence starters
-        starters = ['the', 'a', 'an', 'i', 'you', 'he', 'she', 'it', 'they', 'we']
-        available_starters = [word for word in starters if word in dice_mappings]
-        
-        if available_starters:
-            return random.choice(available_starters)
-        else:
-            # Fall back to any available word that's not a period
-            non_period_words = [k for k in dice_mappings.keys() if k != '.']
-            return random.choice(non_period_words) if non_period_words else 'the'
+        # The available starters only depend on the mappings, so compute
+        # them once and reuse for every sentence of every story
+        if not (self._starters_cache and self._starters_cache[0] is dice_mappings):
+            available = [word for word in self.STARTER_WORDS if word in dice_mappings]
+            if not available:
+                # Fall back to any available word that's not a period
+                available = [k for k in dice_mappings.keys() if k != '.'] or ['the']
+            self._starters_cache = (dice_mappings, available)
+
+        return random.choice(self._starters_cache[1])
 
 # Example usage
 if __name__ == "__main__":